@@ -1,10 +1,12 @@
 import os
 import json
 
+from typing import cast
 from openai import OpenAI
 from openai.types.chat import ChatCompletionMessageParam, ChatCompletionToolParam
 from dotenv import load_dotenv
 from core.agent import BaseAgent
+from core.cassette import cassette_http_client
 from core.utils import validate_openai_api_key
 
 # .env ファイルから環境変数を読み込む
@@ -36,10 +38,20 @@ def calculate(expression: str) -> str:
 
 
 class Memory:
-    """エージェントの記憶（コンテキスト）を管理するクラス。"""
+    """エージェントの記憶（コンテキスト）を管理するクラス。
+
+    max_turns を指定すると、直近 max_turns ターン分（user メッセージから次の
+    user メッセージの直前まで）だけを保持するリングバッファとして動作します。
+    最初の user メッセージより前のメッセージ（システムプロンプト）は常に保持します。
+    ターン単位で捨てるため、tool_calls と対応する tool メッセージが分断されることはありません。
+    """
+
+    def __init__(self, max_turns: int | None = None):
+        if max_turns is not None and max_turns < 1:
+            raise ValueError("max_turns は 1 以上である必要があります")
 
-    def __init__(self):
         self.messages: list[ChatCompletionMessageParam] = []
+        self.max_turns = max_turns
 
     def add_message(
         self,
@@ -58,6 +70,18 @@ class Memory:
             message["name"] = name
         self.messages.append(message)  # type: ignore
 
+        if role == "user" and self.max_turns is not None:
+            self._trim()
+
+    def _trim(self):
+        """保持ターン数を超えた古いターンを先頭から削除する。"""
+        turn_starts = [
+            i for i, message in enumerate(self.messages) if message["role"] == "user"
+        ]
+        excess = len(turn_starts) - cast(int, self.max_turns)
+        if excess > 0:
+            del self.messages[turn_starts[0] : turn_starts[excess]]
+
     def get_messages(self) -> list[ChatCompletionMessageParam]:
         return self.messages
 
@@ -123,8 +147,8 @@ class Executor:
 class Agent(BaseAgent):
     """Planner, Executor, Memory を統括し、エージェントループを制御するクラス。"""
 
-    def __init__(self, client: OpenAI):
-        self.memory = Memory()
+    def __init__(self, client: OpenAI, max_turns: int | None = None):
+        self.memory = Memory(max_turns=max_turns)
         self.planner = Planner(client)
         self.executor = Executor()
 
@@ -185,6 +209,6 @@ class Agent(BaseAgent):
 if __name__ == "__main__":
     if validate_openai_api_key():
         api_key = os.getenv("OPENAI_API_KEY")
-        openai_client = OpenAI(api_key=api_key)
+        openai_client = OpenAI(api_key=api_key, http_client=cassette_http_client())
         agent = Agent(openai_client)
         agent.run("3 + 5 を計算して")
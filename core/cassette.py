@@ -0,0 +1,249 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any
+
+import httpx
+
+# 記録時に保存しないヘッダー。
+# ボディは展開済みで保存するため、圧縮や長さに関するヘッダーは再生時に矛盾する。
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+# 各行は必ずこの接頭辞とキー（SHA-256 の 16 進数 64 文字）で始まる。
+# 索引の作成時は行を JSON として解析せず、この位置からキーだけを切り出す。
+_KEY_PREFIX = b'{"k":"'
+_KEY_LENGTH = 64
+
+
+class Cassette:
+    """リクエストとレスポンスの組を記録・再生するカセットファイル。
+
+    1 行 1 エントリの JSON Lines 形式で保存します。
+    各エントリは `{"k": キー, "t": 所要秒数, "r": レスポンス}` の形をとります。
+    HTTP のレスポンス本体は UTF-8 として読めれば "body" に、
+    読めなければ base64 で "body_b64" に保存します。
+    キーは各行の先頭の固定位置に書かれるため、再生時はファイルを一度走査して
+    「キー -> 行オフセット」の索引だけを作ります（レスポンス本体は解析しない）。
+    レスポンス本体は必要になった時点でシークして読み込みます。
+
+    同じキーが複数回記録されている場合は記録された順に返し、
+    最後まで返したら先頭に戻ります（同じ実行を何度でも再生できるようにするため）。
+
+    LangGraph の並列ブランチなど複数のスレッドから同時に使えるよう、
+    ファイル位置とカーソルを扱う処理はロックで保護します。
+    """
+
+    def __init__(self, path: str, mode: str, realtime: bool = False):
+        """
+        Args:
+            path (str): カセットファイルのパス。
+            mode (str): "record"（記録）または "replay"（再生）。
+            realtime (bool): 再生時に記録された所要時間だけ待機するかどうか。
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"不明なカセットモード: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.realtime = realtime
+        self._index: dict[str, list[int]] = defaultdict(list)
+        self._cursor: dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+        if mode == "record":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, "w", encoding="utf-8")
+        else:
+            self._file = open(path, "rb")
+            self._build_index()
+
+    def _build_index(self) -> None:
+        offset = self._file.tell()
+        key_end = len(_KEY_PREFIX) + _KEY_LENGTH
+        for line in iter(self._file.readline, b""):
+            if not line.startswith(_KEY_PREFIX):
+                raise ValueError(f"カセットの形式が不正です: {self.path}")
+            key = line[len(_KEY_PREFIX) : key_end].decode("ascii")
+            self._index[key].append(offset)
+            offset = self._file.tell()
+
+    @staticmethod
+    def make_key(*parts: object) -> str:
+        """リクエストを表す値から、順序に依存しない安定したキーを作る。"""
+        payload = json.dumps(
+            parts, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def record(self, key: str, response: object, elapsed: float) -> None:
+        """レスポンスを 1 エントリとして追記する。"""
+        # 索引を解析なしで作れるよう、キーを必ず先頭に書く
+        entry = {"k": key, "t": round(elapsed, 6), "r": response}
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+
+    def play(self, key: str) -> tuple[Any, float]:
+        """記録済みのレスポンスと、再生時に待機すべき秒数を返す。
+
+        待機自体は呼び出し側で行います（同期 / 非同期のどちらからも使うため）。
+        """
+        offsets = self._index.get(key)
+        if not offsets:
+            raise KeyError(f"カセットに記録されていないリクエストです: {key}")
+
+        with self._lock:
+            position = self._cursor[key]
+            self._cursor[key] = (position + 1) % len(offsets)
+
+            self._file.seek(offsets[position])
+            line = self._file.readline()
+
+        entry = json.loads(line)
+        delay = entry["t"] if self.realtime else 0.0
+        return entry["r"], delay
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+_cassette: Cassette | None = None
+
+
+def get_cassette() -> Cassette | None:
+    """環境変数の設定に従ってカセットを返す。未設定なら None を返す。
+
+    - CASSETTE_MODE: "record" または "replay"
+    - CASSETTE_PATH: カセットファイルのパス（既定: cassettes/default.jsonl）
+    - CASSETTE_REALTIME: "1" のとき、再生時に記録された所要時間を再現する
+
+    同じプロセス内の OpenAI / MCP 呼び出しが 1 つのカセットを共有できるよう、
+    最初に作ったインスタンスを使い回します。
+    """
+    global _cassette
+
+    mode = os.getenv("CASSETTE_MODE")
+    if not mode:
+        return None
+
+    if _cassette is None:
+        _cassette = Cassette(
+            path=os.getenv("CASSETTE_PATH", "cassettes/default.jsonl"),
+            mode=mode,
+            realtime=os.getenv("CASSETTE_REALTIME") == "1",
+        )
+    return _cassette
+
+
+def _request_key(request: httpx.Request) -> str:
+    body = request.read()
+    try:
+        # JSON ボディはキー順を揃えて比較する
+        body_value: object = json.loads(body) if body else None
+    except ValueError:
+        body_value = body.decode("utf-8", errors="replace")
+    return Cassette.make_key("http", request.method, request.url.path, body_value)
+
+
+def _encode_body(content: bytes) -> dict[str, str]:
+    # UTF-8 として読めるボディ（JSON など）はそのまま、それ以外（音声など）は base64 で保存する
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body_b64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(recorded: dict[str, Any]) -> bytes:
+    if "body_b64" in recorded:
+        return base64.b64decode(recorded["body_b64"])
+    return recorded["body"].encode("utf-8")
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """実際に通信しつつ、レスポンスをカセットに記録する httpx トランスポート。
+
+    実際の通信は内部の httpx.Client に任せます。httpx は transport を指定しない
+    Client にだけ環境変数のプロキシ設定（HTTPS_PROXY など）を適用するため、
+    既定の Client を経由させることで、通常の実行と同じ経路で通信します。
+    """
+
+    def __init__(self, cassette: Cassette, client: httpx.Client | None = None):
+        self.cassette = cassette
+        self.client = client or httpx.Client()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = _request_key(request)
+
+        start = time.perf_counter()
+        response = self.client.send(request)
+        content = response.content
+        elapsed = time.perf_counter() - start
+
+        headers = [
+            (name, value)
+            for name, value in response.headers.items()
+            if name.lower() not in _DROP_HEADERS
+        ]
+        self.cassette.record(
+            key,
+            {
+                "status": response.status_code,
+                "headers": headers,
+                **_encode_body(content),
+            },
+            elapsed,
+        )
+        return httpx.Response(
+            response.status_code, headers=headers, content=content, request=request
+        )
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """通信を行わず、カセットに記録されたレスポンスを返す httpx トランスポート。"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        recorded, delay = self.cassette.play(_request_key(request))
+        if delay:
+            time.sleep(delay)
+        return httpx.Response(
+            recorded["status"],
+            headers=recorded["headers"],
+            content=_decode_body(recorded),
+            request=request,
+        )
+
+
+def cassette_http_client() -> httpx.Client | None:
+    """カセットが有効な場合、記録 / 再生用の httpx.Client を返す。
+
+    OpenAI クライアントや ChatOpenAI の `http_client` 引数にそのまま渡せます。
+    カセットが無効な場合は None を返し、各ライブラリの既定の通信を使います。
+    """
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+
+    if cassette.mode == "record":
+        transport: httpx.BaseTransport = RecordingTransport(cassette)
+    else:
+        transport = ReplayTransport(cassette)
+    return httpx.Client(transport=transport)
@@ -0,0 +1,305 @@
+import argparse
+import gc
+import importlib
+import io
+import json
+import os
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+from typing import Callable, cast
+
+from openai import OpenAI
+from openai.types.chat import ChatCompletion
+
+from core.agent import BaseAgent
+
+
+class StubOpenAI:
+    """OpenAI クライアントの `chat.completions.create` だけを模したローカルスタブ。
+
+    直前のメッセージが tool の結果なら最終回答を、そうでなければ
+    calculate ツールの呼び出しを返します。通信は一切発生しません。
+    SDK のリクエスト変換を通さないため 1 ターンあたりのコストが小さく、
+    長時間の連続実行に向いています。
+    """
+
+    def __init__(self):
+        self.chat = self
+        self.completions = self
+
+    @staticmethod
+    def create(model: str, messages: list, **kwargs: object) -> ChatCompletion:
+        last_message = messages[-1]
+
+        if last_message["role"] == "tool":
+            message: dict[str, object] = {
+                "role": "assistant",
+                "content": f"計算結果は {last_message['content']} です",
+            }
+            finish_reason = "stop"
+        else:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": "call_stub",
+                        "type": "function",
+                        "function": {
+                            "name": "calculate",
+                            "arguments": json.dumps({"expression": "3 + 5"}),
+                        },
+                    }
+                ],
+            }
+            finish_reason = "tool_calls"
+
+        return ChatCompletion.model_validate(
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": message, "finish_reason": finish_reason}
+                ],
+            }
+        )
+
+
+class NullWriter(io.TextIOBase):
+    """書き込まれた文字列をバッファせずに捨てる出力先。
+
+    open(os.devnull, "w") はフラッシュまで文字列をバッファに溜めるため、
+    そのバッファの増減が計測値に混ざってしまう。
+    """
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+
+def current_rss() -> int | None:
+    """現在の RSS（バイト）を返す。
+
+    /proc が無い環境では resource モジュールの最大 RSS で代用し、
+    どちらも使えない環境（Windows など）では None を返す。
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+# ハーネス自身（計測値の記録やループ変数）と tracemalloc の確保は計測対象から除く。
+# 除かないと、一定量のはずのこれらの確保が「1 ターンあたりの増加」に見えてしまう。
+_HARNESS_FILES = (__file__, tracemalloc.__file__)
+
+# 毎ターン同じ入力を使う。ターンごとに文字列を作るとハーネス内での確保になり、
+# エージェントが保持し続けても計測対象から除外されて検出できなくなるため。
+USER_INPUT = "3 + 5 を計算して"
+
+
+def traced_snapshot() -> tracemalloc.Snapshot:
+    """ハーネス自身の確保を除いた tracemalloc のスナップショットを返す。"""
+    return tracemalloc.take_snapshot().filter_traces(
+        [tracemalloc.Filter(False, filename) for filename in _HARNESS_FILES]
+    )
+
+
+def traced_memory() -> int:
+    """ハーネス自身の確保を除いて、tracemalloc が追跡している確保量（バイト）を返す。
+
+    Filter はパターンのコンパイル結果をキャッシュし、その確保が計測値に混ざるため、
+    ここではファイル名を直接比較する。
+    """
+    return sum(
+        trace.size
+        for trace in tracemalloc.take_snapshot().traces
+        if trace.traceback[0].filename not in _HARNESS_FILES
+    )
+
+
+def growth_per_turn(samples: list[tuple[int, int]]) -> float:
+    """(ターン番号, バイト数) の列から、最小二乗法で 1 ターンあたりの増加量を求める。"""
+    n = len(samples)
+    mean_x = sum(x for x, _ in samples) / n
+    mean_y = sum(y for _, y in samples) / n
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in samples)
+    denominator = sum((x - mean_x) ** 2 for x, _ in samples)
+    return numerator / denominator if denominator else 0.0
+
+
+def build_agent(name: str, max_turns: int | None) -> BaseAgent:
+    """ローカルスタブに接続したエージェントを生成する。"""
+    client = cast(OpenAI, StubOpenAI())
+    if name == "adk":
+        module = importlib.import_module("adk-agent.main")
+        return module.Agent(client, max_turns=max_turns)
+    if name == "openai":
+        module = importlib.import_module("openai-agent.main")
+        return module.Agent(client)
+    raise ValueError(f"不明なエージェント: {name}")
+
+
+def run_turns(
+    agent: BaseAgent, turns: range, samples: int, measure: Callable[[], int | None]
+) -> list[tuple[int, int]]:
+    """指定範囲のターンを実行し、一定間隔で measure() の値を記録する。
+
+    measure() が None を返した場合（計測できない環境）は記録しない。
+    """
+    interval = max(1, len(turns) // samples)
+    # 計測中にリストが伸びないよう、記録先は先に確保しておく
+    measured: list[tuple[int, int] | None] = [None] * (len(turns) // interval)
+    count = 0
+
+    # エージェントのログ出力は捨てる（バッファに溜めると計測対象が増えてしまう）
+    with redirect_stdout(NullWriter()):
+        for turn in turns:
+            agent.run(USER_INPUT)
+
+            if (turn - turns.start + 1) % interval == 0:
+                gc.collect()
+                value = measure()
+                if value is not None:
+                    measured[count] = (turn, value)
+                    count += 1
+    return cast(list[tuple[int, int]], measured[:count])
+
+
+def run_soak(
+    agent: BaseAgent, turns: int, warmup: int, samples: int, traced_turns: int
+) -> dict:
+    """エージェントを繰り返し実行し、メモリ使用量の推移を計測する。
+
+    1. ウォームアップ後、turns ターンを実行しながら RSS を一定間隔で記録する。
+    2. 続けて tracemalloc を有効にして traced_turns ターンを実行し、
+       確保量の推移と、確保量が増えた箇所の上位を記録する（ハーネス自身の確保は除く）。
+       tracemalloc は実行を大きく遅くするため、この段階だけで有効にする。
+       （計測前に warmup ターンの追跡付きウォームアップを行う）
+
+    いずれも 1 ターンあたりの増加量（バイト）を最小二乗法で求めて返します。
+    RSS を取得できない環境では、RSS の値は None になります（tracemalloc のみで判定する）。
+    """
+    run_turns(agent, range(warmup), 1, current_rss)
+    rss_samples = run_turns(agent, range(warmup, warmup + turns), samples, current_rss)
+
+    tracemalloc.start()
+    # 追跡開始前に確保されたメモリは計測されない。CPython は解放した dict などを
+    # フリーリストから malloc を通さずに再利用するため、未追跡のメモリが保持中の
+    # 履歴に使われ続け、それが入れ替わるだけで増加に見える。
+    # フリーリストは GC で空になるので、10 ターンごとに GC しながら一巡させてから基準を取る
+    start = warmup + turns
+    traced_warmup = max(warmup, 1)
+    run_turns(
+        agent,
+        range(start, start + traced_warmup),
+        max(1, traced_warmup // 10),
+        lambda: None,
+    )
+    gc.collect()
+    baseline = traced_snapshot()
+    start += traced_warmup
+    traced_samples = run_turns(
+        agent, range(start, start + traced_turns), samples, traced_memory
+    )
+    gc.collect()
+    final = traced_snapshot()
+    tracemalloc.stop()
+
+    top_growth = [
+        str(stat)
+        for stat in final.compare_to(baseline, "lineno")[:10]
+        if stat.size_diff > 0
+    ]
+
+    return {
+        "rss_growth": growth_per_turn(rss_samples) if rss_samples else None,
+        "traced_growth": growth_per_turn(traced_samples),
+        "rss_final": rss_samples[-1][1] if rss_samples else None,
+        "traced_final": traced_samples[-1][1],
+        "top_growth": top_growth,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="ローカルスタブに対してエージェントを長時間実行し、メモリリークを検出する。"
+    )
+    parser.add_argument("--agent", choices=["adk", "openai"], default="adk")
+    parser.add_argument("--turns", type=int, default=100000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument(
+        "--traced-turns",
+        type=int,
+        default=2000,
+        help="tracemalloc を有効にして実行するターン数",
+    )
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument(
+        "--max-turns",
+        type=int,
+        default=10,
+        help="ADK の Memory に保持するターン数（0 で無制限）",
+    )
+    parser.add_argument(
+        "--max-traced-growth",
+        type=float,
+        default=16.0,
+        help="許容する tracemalloc の増加量（バイト/ターン）",
+    )
+    parser.add_argument(
+        "--max-rss-growth",
+        type=float,
+        default=256.0,
+        help="許容する RSS の増加量（バイト/ターン）",
+    )
+    args = parser.parse_args()
+
+    if min(args.turns, args.traced_turns) < args.samples:
+        parser.error("--turns と --traced-turns は --samples 以上である必要があります")
+
+    agent = build_agent(args.agent, args.max_turns or None)
+    report = run_soak(agent, args.turns, args.warmup, args.samples, args.traced_turns)
+
+    print(f"Agent: {args.agent}, Turns: {args.turns} (+{args.traced_turns} traced)")
+    print(
+        f"tracemalloc: {report['traced_final']} bytes "
+        f"({report['traced_growth']:.2f} bytes/turn)"
+    )
+    if report["rss_growth"] is None:
+        print("RSS: unavailable on this platform (skipped)")
+    else:
+        print(
+            f"RSS: {report['rss_final']} bytes "
+            f"({report['rss_growth']:.2f} bytes/turn)"
+        )
+
+    failed = False
+    if report["traced_growth"] > args.max_traced_growth:
+        print("Error: tracemalloc memory grows per turn.")
+        failed = True
+    if report["rss_growth"] is not None and report["rss_growth"] > args.max_rss_growth:
+        print("Error: RSS grows per turn.")
+        failed = True
+
+    if failed and report["top_growth"]:
+        print("Top growth since tracing started:")
+        for line in report["top_growth"]:
+            print(f"  {line}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
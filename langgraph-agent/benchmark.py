@@ -0,0 +1,115 @@
+import argparse
+import gc
+import operator
+import time
+from typing import Annotated, Any, Callable, TypedDict, cast
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+
+from .message_log import MessageLog, MessageLogChannel, append_messages
+
+
+class ListState(TypedDict):
+    messages: Annotated[list[BaseMessage], operator.add]
+
+
+class LogState(TypedDict):
+    messages: Annotated[MessageLog, MessageLogChannel()]
+
+
+def step(state: dict) -> dict[str, list[BaseMessage]]:
+    """AIMessage を 1 件追加するだけのノード。"""
+    return {"messages": [AIMessage(content="ok")]}
+
+
+def build_graph(state: type, until: int) -> Any:
+    """履歴が until 件になるまで step ノードをループするグラフを作る。"""
+
+    def should_continue(current: dict) -> str:
+        # len() はどちらの型でも O(1) なので、ルーターのコストは履歴の長さによらない
+        return "step" if len(current["messages"]) < until else END
+
+    workflow = StateGraph(cast(Any, state))
+    workflow.add_node("step", cast(Any, step))
+    workflow.set_entry_point("step")
+    workflow.add_conditional_edges("step", should_continue, {"step": "step", END: END})
+    return workflow.compile()
+
+
+def time_per_step(state: type, history: int, steps: int) -> float:
+    """history 件の履歴から始めて steps ステップ実行し、1 ステップあたりの秒数を返す。
+
+    入力の取り込みなど初回だけのコストを除くため、最初の更新が届いてから計測する。
+    また timeit と同様に、計測中は GC を止めて履歴の件数に比例する GC のコストを除く。
+    """
+    app = build_graph(state, history + steps)
+    inputs = {"messages": [HumanMessage(content=str(i)) for i in range(history)]}
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = 0.0
+        for i, _ in enumerate(
+            app.stream(
+                cast(Any, inputs),
+                {"recursion_limit": steps + 10},
+                stream_mode="updates",
+            )
+        ):
+            if i == 0:
+                start = time.perf_counter()
+        return (time.perf_counter() - start) / (steps - 1)
+    finally:
+        gc.enable()
+
+
+def time_reducer(
+    reducer: Callable[[Any, Any], Any], initial: Any, history: int, steps: int
+) -> float:
+    """リデューサー単体で 1 件ずつ steps 回追記したときの 1 回あたりの秒数を返す。"""
+    value = reducer(initial, [HumanMessage(content=str(i)) for i in range(history)])
+    delta = [AIMessage(content="ok")]
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(steps):
+            value = reducer(value, delta)
+        return (time.perf_counter() - start) / steps
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="AgentState.messages のリデューサーごとに、履歴の長さと 1 ステップのコストを比較する。"
+    )
+    parser.add_argument(
+        "--histories", type=int, nargs="+", default=[100, 1000, 10000, 100000]
+    )
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.steps < 2:
+        parser.error("--steps は 2 以上である必要があります")
+
+    print(f"{'history':>8} | {'reducer':>22} | {'graph step':>22}")
+    print(
+        f"{'':>8} | {'operator.add':>10} {'append':>11}"
+        f" | {'operator.add':>10} {'append':>11}"
+    )
+    for history in args.histories:
+        reducer_add = time_reducer(operator.add, [], history, args.steps)
+        reducer_log = time_reducer(append_messages, MessageLog(), history, args.steps)
+        graph_add = time_per_step(ListState, history, args.steps)
+        graph_log = time_per_step(LogState, history, args.steps)
+        print(
+            f"{history:>8} | {reducer_add * 1e6:>9.1f}us {reducer_log * 1e6:>9.1f}us"
+            f" | {graph_add * 1e6:>9.1f}us {graph_log * 1e6:>9.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
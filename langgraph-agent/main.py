@@ -1,5 +1,4 @@
 import os
-import operator
 from typing import Annotated, TypedDict, cast, Any
 from pydantic import SecretStr
 
@@ -17,7 +16,9 @@ from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
 
 from core.agent import BaseAgent
+from core.cassette import cassette_http_client
 from core.utils import validate_openai_api_key
+from .message_log import MessageLog, MessageLogChannel
 
 # .env ファイルから環境変数を読み込む
 load_dotenv()
@@ -50,9 +51,10 @@ def calculate(expression: str) -> str:
 class AgentState(TypedDict):
     """グラフの状態を管理する。"""
 
-    # メッセージ履歴。Annotated[..., operator.add] を使うことで、
-    # 新しいメッセージがリストに追加されるようになる。
-    messages: Annotated[list[BaseMessage], operator.add]
+    # メッセージ履歴。Annotated[..., MessageLogChannel()] を使うことで、
+    # 新しいメッセージが履歴に追加されるようになる。
+    # operator.add と違い、更新のたびに履歴全体をコピーしない。
+    messages: Annotated[MessageLog, MessageLogChannel()]
 
 
 # --- Nodes ---
@@ -92,15 +94,20 @@ def tool_node(state: AgentState) -> dict[str, list[BaseMessage]]:
     return {"messages": results}
 
 
-def result_node(state: AgentState) -> dict[str, list[BaseMessage]]:
+class ResultNode:
     """最終回答を生成するノード。"""
-    print("[Result] Finalizing result...")
-    # ツール実行結果を含めて再度LLMを呼び出し、自然言語の回答を得る
-    # ここでは単純に最後のメッセージを表示するのではなく、
-    # ツール結果を解釈した最終的なメッセージを生成する
-    model = ChatOpenAI(model="gpt-4o")
-    response = model.invoke(state["messages"])
-    return {"messages": [cast(BaseMessage, response)]}
+
+    def __init__(self, model: ChatOpenAI):
+        # Agent と同じモデル（＝同じ http_client）を使い、カセットの記録 / 再生対象に含める
+        self.model = model
+
+    def __call__(self, state: AgentState) -> dict[str, list[BaseMessage]]:
+        print("[Result] Finalizing result...")
+        # ツール実行結果を含めて再度LLMを呼び出し、自然言語の回答を得る
+        # ここでは単純に最後のメッセージを表示するのではなく、
+        # ツール結果を解釈した最終的なメッセージを生成する
+        response = self.model.invoke(state["messages"])
+        return {"messages": [cast(BaseMessage, response)]}
 
 
 # --- Router ---
@@ -122,7 +129,9 @@ class Agent(BaseAgent):
 
     def __init__(self, api_key_val: str):
         self.model = ChatOpenAI(
-            api_key=cast(SecretStr, cast(object, api_key_val)), model="gpt-4o"
+            api_key=cast(SecretStr, cast(object, api_key_val)),
+            model="gpt-4o",
+            http_client=cassette_http_client(),
         )
 
         # グラフの定義
@@ -131,7 +140,7 @@ class Agent(BaseAgent):
         # ノードの追加
         workflow.add_node("planner", cast(Any, Planner(self.model)))
         workflow.add_node("tool", cast(Any, tool_node))
-        workflow.add_node("result", cast(Any, result_node))
+        workflow.add_node("result", cast(Any, ResultNode(self.model)))
 
         # エッジの設定
         workflow.set_entry_point("planner")
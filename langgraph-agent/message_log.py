@@ -0,0 +1,126 @@
+from collections.abc import Iterable, Iterator, Sequence
+from typing import Any, overload
+
+from langchain_core.messages import BaseMessage
+from langgraph.channels import BinaryOperatorAggregate
+
+
+class MessageLog(Sequence[BaseMessage]):
+    """追記専用のメッセージ履歴。
+
+    複数の MessageLog が 1 つのバッファを共有し、それぞれが「先頭から何件目までが
+    自分の内容か」だけを持ちます。最新の MessageLog への追記はバッファの末尾に
+    差分を足すだけなので、コストは追加件数に比例します（履歴の長さによらない）。
+
+    一度作った MessageLog の内容は変わりません。古い MessageLog に追記した場合でも、
+    バッファの続きが追記するメッセージと同一であれば共有したままにします
+    （LangGraph は条件付きエッジの評価用と本来の状態更新用に、同じ更新を 2 回適用する）。
+    それ以外（チェックポイントからの分岐など）は、その時点でバッファを複製します。
+    """
+
+    __slots__ = ("_buffer", "_length")
+
+    def __init__(self, messages: Iterable[BaseMessage] = ()):
+        self._buffer: list[BaseMessage] = list(messages)
+        self._length = len(self._buffer)
+
+    def append(self, messages: Iterable[BaseMessage]) -> "MessageLog":
+        """messages を追記した新しい MessageLog を返す。自身の内容は変わらない。"""
+        messages = list(messages)
+        buffer = self._buffer
+        end = self._length + len(messages)
+
+        if len(buffer) != self._length:
+            # 既に他の MessageLog が同じバッファに追記している
+            tail = buffer[self._length : end]
+            if len(tail) == len(messages) and all(
+                a is b for a, b in zip(tail, messages)
+            ):
+                return self._view(buffer, end)
+            buffer = buffer[: self._length]
+
+        buffer.extend(messages)
+        return self._view(buffer, end)
+
+    @staticmethod
+    def _view(buffer: list[BaseMessage], length: int) -> "MessageLog":
+        log = MessageLog.__new__(MessageLog)
+        log._buffer = buffer
+        log._length = length
+        return log
+
+    def __len__(self) -> int:
+        return self._length
+
+    @overload
+    def __getitem__(self, index: int) -> BaseMessage: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[BaseMessage]: ...
+
+    def __getitem__(self, index: int | slice) -> BaseMessage | list[BaseMessage]:
+        if isinstance(index, slice):
+            return self._buffer[: self._length][index]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("MessageLog index out of range")
+        return self._buffer[index]
+
+    def __iter__(self) -> Iterator[BaseMessage]:
+        buffer = self._buffer
+        for i in range(self._length):
+            yield buffer[i]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (MessageLog, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __reduce__(self) -> tuple[type["MessageLog"], tuple[list[BaseMessage]]]:
+        # 共有バッファのうち自分の範囲だけを保存する
+        return MessageLog, (list(self),)
+
+    def __repr__(self) -> str:
+        return f"MessageLog({list(self)!r})"
+
+
+def append_messages(
+    left: Sequence[BaseMessage], right: Sequence[BaseMessage]
+) -> MessageLog:
+    """AgentState.messages 用のリデューサー。
+
+    operator.add は更新のたびに履歴全体をコピーした新しいリストを作るが、
+    こちらは MessageLog.append により差分だけを追記する。
+    """
+    if not isinstance(left, MessageLog):
+        # 初期値や Overwrite で渡されたリストは一度だけ MessageLog に変換する
+        left = MessageLog(left)
+    return left.append(right)
+
+
+class MessageLogChannel(BinaryOperatorAggregate):
+    """MessageLog を値に持つ LangGraph のチャネル。
+
+    チェックポイントのシリアライザーは MessageLog を扱えないため、
+    チェックポイントには通常のリストとして保存し、復元時に MessageLog に戻す。
+    チェックポイントを使わない実行では checkpoint() は呼ばれないので、
+    各ステップのコストは append_messages の差分追記だけのままになる。
+
+    使い方: `messages: Annotated[MessageLog, MessageLogChannel()]`
+    """
+
+    __slots__ = ()
+
+    def __init__(self, typ: Any = MessageLog, operator: Any = append_messages):
+        super().__init__(typ, operator)
+
+    def checkpoint(self) -> Any:
+        value = super().checkpoint()
+        return list(value) if isinstance(value, MessageLog) else value
+
+    def from_checkpoint(self, checkpoint: Any) -> "MessageLogChannel":
+        channel = super().from_checkpoint(checkpoint)
+        if isinstance(channel.value, list):
+            channel.value = MessageLog(channel.value)
+        return channel
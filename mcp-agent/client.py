@@ -1,12 +1,65 @@
 import sys
 import os
+import time
 
+import anyio
+import mcp.types as types
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 
+from core.cassette import Cassette, get_cassette
+
+
+class RecordingSession:
+    """ClientSession をラップし、call_tool の結果をカセットに記録するセッション。"""
+
+    def __init__(self, session: ClientSession, cassette: Cassette):
+        self.session = session
+        self.cassette = cassette
+
+    async def call_tool(
+        self, name: str, arguments: dict | None = None
+    ) -> types.CallToolResult:
+        start = time.perf_counter()
+        result = await self.session.call_tool(name, arguments=arguments)
+        elapsed = time.perf_counter() - start
+
+        self.cassette.record(
+            Cassette.make_key("mcp", name, arguments),
+            result.model_dump(mode="json", by_alias=True, exclude_none=True),
+            elapsed,
+        )
+        return result
+
+
+class ReplaySession:
+    """サーバーを起動せず、カセットに記録された call_tool の結果を返すセッション。"""
+
+    def __init__(self, cassette: Cassette):
+        self.cassette = cassette
+
+    async def call_tool(
+        self, name: str, arguments: dict | None = None
+    ) -> types.CallToolResult:
+        recorded, delay = self.cassette.play(Cassette.make_key("mcp", name, arguments))
+        if delay:
+            await anyio.sleep(delay)
+        return types.CallToolResult.model_validate(recorded)
+
 
 async def run_add_tool(a, b):
-    """MCP Server に接続して add ツールを呼び出す。"""
+    """MCP Server に接続して add ツールを呼び出す。
+
+    環境変数 CASSETTE_MODE が設定されている場合は、
+    ツール呼び出しをカセットに記録、またはカセットから再生します。
+    """
+    cassette = get_cassette()
+    if cassette is not None and cassette.mode == "replay":
+        result = await ReplaySession(cassette).call_tool(
+            "add", arguments={"a": a, "b": b}
+        )
+        return result.content[0].text
+
     # サーバーの起動パラメータを設定
     env = dict(os.environ)
     env["PYTHONPATH"] = os.getcwd()
@@ -25,13 +78,15 @@ async def run_add_tool(a, b):
             # tools = await session.list_tools()
             # print(f"Available tools: {tools}")
 
+            tool_session = (
+                RecordingSession(session, cassette) if cassette is not None else session
+            )
+
             # add ツールを呼び出す
-            result = await session.call_tool("add", arguments={"a": a, "b": b})
+            result = await tool_session.call_tool("add", arguments={"a": a, "b": b})
             return result.content[0].text
 
 
 if __name__ == "__main__":
-    import anyio
-
     res = anyio.run(run_add_tool, 3, 5)
     print(f"Result: {res}")
@@ -6,6 +6,7 @@ from openai import OpenAI
 from openai.types.chat import ChatCompletionMessageParam, ChatCompletionToolParam
 from dotenv import load_dotenv
 from core.agent import BaseAgent
+from core.cassette import cassette_http_client
 from core.utils import validate_openai_api_key
 
 
@@ -153,6 +154,6 @@ class Agent(BaseAgent):
 if __name__ == "__main__":
     if validate_openai_api_key():
         api_key = os.getenv("OPENAI_API_KEY")
-        openai_client = OpenAI(api_key=api_key)
+        openai_client = OpenAI(api_key=api_key, http_client=cassette_http_client())
         agent = Agent(openai_client)
         agent.run("3 + 5 を計算して")